@@ -8,41 +8,198 @@ Notes:
   torch==2.0.0, torchvision==0.15.1, torchaudio==2.0.1
 - Falls back across tags: cu121 -> cu118 -> cpu (or cu118 -> cpu), based on detection.
 - If you prefer different versions, override with --torch-version/--torchvision-version/--torchaudio-version.
+- Set TORCH_WHEEL_TAG (e.g. cu118) to skip detection; a versioned CUDA_PATH/CUDA_HOME is used before probing the driver.
+- Detection results are cached for 24 h under %LOCALAPPDATA%\DynamiCrafter; use --refresh (or --reinstall) to re-detect.
 - After install, it verifies CUDA availability and prints diagnostics.
 """
 from __future__ import annotations
 
 import argparse
+import concurrent.futures
+import functools
+import hashlib
+import json
+import logging
 import os
 import platform
 import re
 import shutil
 import subprocess
 import sys
-import tempfile
+import sysconfig
+import time
+import urllib.error
+import urllib.parse
 import urllib.request
 from pathlib import Path
 from typing import Optional, Tuple
 
+log = logging.getLogger("install_torch")
 
-def run(cmd: list[str]) -> tuple[int, str, str]:
-    proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    out, err = proc.communicate()
-    return proc.returncode, out.strip(), err.strip()
+_DLL_DIRECTORIES: list = []
 
 
-def detect_cuda_version() -> Optional[Tuple[int, int]]:
-    """Return (major, minor) if CUDA is detected via nvidia-smi, else None."""
+def _add_dll_directories() -> None:
+    """Help Windows locate torch's and the CUDA toolkit's dependent DLLs; runs once at import."""
+    if os.name != "nt" or not hasattr(os, "add_dll_directory"):
+        return
+    candidates = [Path(sysconfig.get_paths()["purelib"]) / "torch" / "lib"]
+    if os.environ.get("CUDA_PATH"):
+        candidates.append(Path(os.environ["CUDA_PATH"]) / "bin")
+    for d in candidates:
+        if d.is_dir():
+            try:
+                _DLL_DIRECTORIES.append(os.add_dll_directory(str(d)))
+            except OSError:
+                pass
+
+
+_add_dll_directories()
+
+NVSMI_TIMEOUT = 30
+
+
+def run(cmd: list[str], timeout: Optional[float] = None) -> tuple[int, str, str]:
+    """Run cmd and return (returncode, stdout, stderr); a timeout is reported as a failure, not raised."""
+    try:
+        cp = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        return 1, "", f"Timed out after {timeout}s: {' '.join(cmd)}"
+    return cp.returncode, cp.stdout.strip(), cp.stderr.strip()
+
+
+def _load_nvml():
+    import ctypes
+    if os.name == "nt":
+        candidates = [
+            "nvml.dll",
+            os.path.join(os.environ.get("ProgramFiles", r"C:\Program Files"), "NVIDIA Corporation", "NVSMI", "nvml.dll"),
+        ]
+        loader = ctypes.WinDLL
+    else:
+        candidates = ["libnvidia-ml.so.1", "libnvidia-ml.so"]
+        loader = ctypes.CDLL
+    for name in candidates:
+        try:
+            return loader(name)
+        except OSError:
+            continue
+    return None
+
+
+def _detect_cuda_via_nvml() -> Optional[Tuple[int, int]]:
+    """Return (major, minor) of the driver's CUDA version via NVML, else None."""
+    try:
+        import ctypes
+        nvml = _load_nvml()
+        if nvml is None:
+            return None
+        if nvml.nvmlInit_v2() != 0:
+            return None
+        try:
+            ver = ctypes.c_int()
+            if nvml.nvmlSystemGetCudaDriverVersion_v2(ctypes.byref(ver)) != 0:
+                return None
+        finally:
+            nvml.nvmlShutdown()
+    except Exception:
+        return None
+    return ver.value // 1000, (ver.value % 1000) // 10
+
+
+# CUDA version -> minimum driver (Linux, Windows) that supports it, newest first.
+# From the CUDA Toolkit release notes; Windows minimums differ, e.g. CUDA 12.0 needs 527.41 there.
+_DRIVER_CUDA_TABLE: list[tuple[tuple[int, int], str, str]] = [
+    ((12, 6), "560.28.03", "560.76"),
+    ((12, 5), "555.42.02", "555.85"),
+    ((12, 4), "550.54.14", "551.61"),
+    ((12, 3), "545.23.06", "545.84"),
+    ((12, 2), "535.54.03", "536.25"),
+    ((12, 1), "530.30.02", "531.14"),
+    ((12, 0), "525.60.13", "527.41"),
+    ((11, 8), "520.61.05", "520.06"),
+    ((11, 7), "515.43.04", "516.01"),
+    ((11, 6), "510.39.01", "511.23"),
+    ((11, 5), "495.29.05", "496.04"),
+    ((11, 4), "470.42.01", "471.11"),
+    ((11, 3), "465.19.01", "465.89"),
+    ((11, 2), "460.27.03", "460.82"),
+    ((11, 1), "455.23", "456.38"),
+    ((11, 0), "450.36.06", "451.22"),
+]
+
+
+def _version_tuple(v: str) -> tuple[int, ...]:
+    return tuple(int(p) for p in v.strip().split("."))
+
+
+def cuda_for_driver(driver: str, windows: Optional[bool] = None) -> Optional[Tuple[int, int]]:
+    """Map a driver version string like '531.14' to the highest CUDA version it supports."""
+    if windows is None:
+        windows = os.name == "nt"
+    try:
+        installed = _version_tuple(driver)
+    except ValueError:
+        return None
+    for cuda, linux_min, windows_min in _DRIVER_CUDA_TABLE:
+        if installed >= _version_tuple(windows_min if windows else linux_min):
+            return cuda
+    return None
+
+
+def _detect_cuda_via_nvsmi() -> Optional[Tuple[int, int]]:
     nvsmi = shutil.which("nvidia-smi") or os.environ.get("NVIDIA_SMI") or os.environ.get("NVSMI_PATH")
     if not nvsmi:
         return None
-    code, out, _ = run([nvsmi])
+    code, out, _ = run([nvsmi, "--query-gpu=driver_version", "--format=csv,noheader,nounits"], timeout=NVSMI_TIMEOUT)
+    if code == 0 and out:
+        ver = cuda_for_driver(out.splitlines()[0])
+        if ver:
+            return ver
+    # Older drivers may not support --query-gpu; parse the full text report instead.
+    code, out, _ = run([nvsmi], timeout=NVSMI_TIMEOUT)
     if code != 0:
         return None
-    m = re.search(r"CUDA Version:\s*(\d+)\.(\d+)", out)
-    if not m:
+    return parse_nvsmi_cuda(out)
+
+
+def parse_nvsmi_cuda(out: str) -> Optional[Tuple[int, int]]:
+    """Extract (major, minor) from the 'CUDA Version: 12.2' field of the nvidia-smi report."""
+    _, sep, tail = out.partition("CUDA Version:")
+    if not sep:
+        return None
+    try:
+        major, minor = tail.split()[0].strip("|").split(".")[:2]
+        return int(major), int(minor)
+    except (IndexError, ValueError):
         return None
-    return int(m.group(1)), int(m.group(2))
+
+
+_CUDA_PATH_RE = re.compile(r"(\d+)\.(\d+)$")
+
+
+def _detect_cuda_via_env() -> Optional[Tuple[int, int]]:
+    """Return (major, minor) from a versioned CUDA_PATH/CUDA_HOME such as '...\\CUDA\\v11.8' or '/usr/local/cuda-12.1'."""
+    for var in ("CUDA_PATH", "CUDA_HOME"):
+        path = os.environ.get(var)
+        if not path:
+            continue
+        m = _CUDA_PATH_RE.search(os.path.basename(os.path.normpath(path)))
+        if m:
+            return int(m.group(1)), int(m.group(2))
+    return None
+
+
+WHEEL_TAGS = ["cpu", "cu118", "cu121", "cu122"]
+
+
+@functools.lru_cache(maxsize=1)
+def detect_cuda_version() -> Optional[Tuple[int, int]]:
+    """Return (major, minor) from CUDA_PATH/CUDA_HOME, NVML or nvidia-smi (in that order), else None.
+
+    The result is cached for the lifetime of the process.
+    """
+    return _detect_cuda_via_env() or _detect_cuda_via_nvml() or _detect_cuda_via_nvsmi()
 
 
 def map_cuda_to_tag(ver: Optional[Tuple[int, int]]) -> str:
@@ -61,19 +218,112 @@ def index_url_for_tag(tag: str) -> str:
     return "https://download.pytorch.org/whl/cpu" if tag == "cpu" else f"https://download.pytorch.org/whl/{tag}"
 
 
+@functools.lru_cache(maxsize=1)
+def _get_nvcuda():
+    """Load nvcuda.dll once and return the handle."""
+    import ctypes
+    return ctypes.WinDLL("nvcuda.dll")
+
+
+@functools.lru_cache(maxsize=1)
 def check_nvcuda() -> tuple[bool, str]:
+    if os.name != "nt":
+        return True, "nvcuda.dll: N/A (non-Windows)"
     try:
-        import ctypes  # noqa: F401
-        ctypes.WinDLL("nvcuda.dll")
+        _get_nvcuda()
         return True, "nvcuda.dll load: OK"
     except Exception as e:
         return False, f"nvcuda.dll load: FAIL: {e}"
 
 
 VC_REDIST_URL = "https://aka.ms/vs/17/release/vc_redist.x64.exe"
+# aka.ms always serves the latest build, so no hash is pinned by default; set this to enforce one.
+VC_REDIST_SHA256: Optional[str] = None
+
+
+def cache_dir() -> Path:
+    """Per-user cache directory (%LOCALAPPDATA%\\DynamiCrafter on Windows)."""
+    base = os.environ.get("LOCALAPPDATA") or os.path.join(Path.home(), ".cache")
+    return Path(base) / "DynamiCrafter"
+
+
+INSTALL_CACHE_TTL = 24 * 60 * 60
+
+
+def _cache_path() -> Path:
+    return cache_dir() / "install_cache.json"
+
+
+def _load_cache() -> Optional[dict]:
+    """Return the cached detection result if it is younger than INSTALL_CACHE_TTL, else None."""
+    try:
+        data = json.loads(_cache_path().read_text())
+    except (OSError, ValueError):
+        return None
+    if not isinstance(data, dict) or data.get("tag") not in WHEEL_TAGS or not isinstance(data.get("cuda"), str):
+        return None
+    try:
+        major, minor = _version_tuple(data["cuda"])
+    except ValueError:
+        return None
+    ts = data.get("ts")
+    if not isinstance(ts, (int, float)) or time.time() - ts > INSTALL_CACHE_TTL:
+        return None
+    return data
+
+
+def _save_cache(ver: Tuple[int, int], tag: str, vcredist_ok: bool) -> None:
+    data = {"cuda": f"{ver[0]}.{ver[1]}", "tag": tag, "vcredist_ok": vcredist_ok, "ts": time.time()}
+    try:
+        path = _cache_path()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data))
+    except OSError:
+        pass
 
 
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def download_vcredist() -> Path:
+    """Download the MSVC redistributable into the cache dir, reusing a previously verified copy."""
+    exe_path = cache_dir() / "vc_redist.x64.exe"
+    sha_path = exe_path.with_name(exe_path.name + ".sha256")
+    if exe_path.exists() and sha_path.exists():
+        digest = _sha256(exe_path)
+        if digest == sha_path.read_text().strip() and (not VC_REDIST_SHA256 or digest == VC_REDIST_SHA256.lower()):
+            log.info("Using cached MSVC redistributable at %s", exe_path)
+            return exe_path
+
+    exe_path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = exe_path.with_name(exe_path.name + ".part")
+    log.info("Downloading MSVC redistributable from %s …", VC_REDIST_URL)
+    with urllib.request.urlopen(VC_REDIST_URL, timeout=60) as r, open(part_path, "wb") as f:
+        expected = int(r.headers.get("Content-Length") or 0)
+        shutil.copyfileobj(r, f, 1 << 20)
+    size = part_path.stat().st_size
+    if expected and size != expected:
+        part_path.unlink()
+        raise IOError(f"Incomplete download: got {size} of {expected} bytes")
+    digest = _sha256(part_path)
+    if VC_REDIST_SHA256 and digest != VC_REDIST_SHA256.lower():
+        part_path.unlink()
+        raise IOError(f"SHA-256 mismatch: got {digest}, expected {VC_REDIST_SHA256}")
+    os.replace(part_path, exe_path)
+    sha_path.write_text(digest)
+    log.info("Saved to %s", exe_path)
+    return exe_path
+
+
+@functools.lru_cache(maxsize=1)
 def check_vcredist() -> tuple[bool, str]:
+    if os.name != "nt":
+        return True, "MSVC runtime: N/A (non-Windows)"
     try:
         import ctypes  # noqa: F401
         try:
@@ -87,94 +337,274 @@ def check_vcredist() -> tuple[bool, str]:
         return False, f"MSVC runtime load: FAIL: {e}"
 
 
-def ensure_pip_available() -> None:
-    print("Ensuring pip is available (using ensurepip)…")
-    code, out, err = run([sys.executable, "-m", "ensurepip", "--upgrade"])
-    if out:
-        print(out)
-    if code != 0 and err:
-        print(err, file=sys.stderr)
-    code, out, err = run([sys.executable, "-m", "pip", "install", "-U", "pip", "setuptools", "wheel"])
-    if out:
-        print(out)
-    if code != 0 and err:
-        print(err, file=sys.stderr)
+MIN_PIP_VERSION = (24, 0)
 
 
-def current_torch_summary() -> Tuple[Optional[str], Optional[str]]:
-    try:
-        import importlib.metadata as md
-        version = md.version("torch")
-    except Exception:
-        version = None
-    cuda = None
+def _pip_version() -> Optional[Tuple[int, int]]:
+    """Return (major, minor) of the venv's pip, or None if pip is not usable."""
+    code, out, _ = run([sys.executable, "-m", "pip", "--version"])
+    if code != 0:
+        return None
     try:
-        import torch  # type: ignore
-        cuda = getattr(torch.version, "cuda", None)
-    except Exception:
-        pass
-    return version, cuda
+        major, minor = out.split()[1].split(".")[:2]
+        return int(major), int(minor)
+    except (IndexError, ValueError):
+        return (0, 0)
 
 
-def uninstall_torch() -> int:
-    cmd = [sys.executable, "-m", "pip", "uninstall", "-y", "torch", "torchvision", "torchaudio"]
-    print("Uninstalling existing PyTorch packages if present…")
-    code, out, err = run(cmd)
-    print(out)
-    if code != 0 and "not installed" not in (out + err).lower():
-        print(err, file=sys.stderr)
-    return 0
+def ensure_pip_available() -> None:
+    pip_ver = _pip_version()
+    if pip_ver is None:
+        log.info("Ensuring pip is available (using ensurepip)…")
+        code, out, err = run([sys.executable, "-m", "ensurepip", "--upgrade", "--default-pip"])
+        if out:
+            log.info(out)
+        if code != 0:
+            if err:
+                log.error(err)
+            return
+        pip_ver = (0, 0)
+    if pip_ver >= MIN_PIP_VERSION:
+        log.info("pip %d.%d is recent enough; skipping upgrade.", *pip_ver)
+        return
+    code, out, err = run([sys.executable, "-m", "pip", "install", "-U", "pip", "setuptools", "wheel"])
+    if out:
+        log.info(out)
+    if code != 0 and err:
+        log.error(err)
 
 
-def install_torch(tag: str, tv: Optional[str], ttv: Optional[str], tau: Optional[str]) -> int:
+def install_torch(
+    tag: str, tv: Optional[str], ttv: Optional[str], tau: Optional[str], reinstall: bool = False
+) -> tuple[int, str]:
     url = index_url_for_tag(tag)
     pkgs: list[str] = []
     pkgs.append(f"torch=={tv}" if tv else "torch")
     pkgs.append(f"torchvision=={ttv}" if ttv else "torchvision")
     pkgs.append(f"torchaudio=={tau}" if tau else "torchaudio")
-    cmd = [sys.executable, "-m", "pip", "install", "--upgrade", *pkgs, "--index-url", url]
-    print("Installing PyTorch with:", " ".join(cmd))
+    # Wheels only and no dependency resolution against the torch index; install_torch_deps adds runtime deps.
+    cmd = [
+        sys.executable, "-m", "pip", "install", "--upgrade", *pkgs,
+        "--index-url", url, "--only-binary=:all:", "--prefer-binary", "--no-deps", "--no-build-isolation",
+    ]
+    if reinstall:
+        # Replaces existing wheels in place; cheaper than a separate pip uninstall pass.
+        cmd.append("--force-reinstall")
+    log.info("Installing PyTorch with: %s", " ".join(cmd))
     code, out, err = run(cmd)
-    print(out)
+    log.info(out)
     if code != 0:
-        print(err, file=sys.stderr)
-    return code
+        log.error(err)
+    return code, err
 
 
-def try_install_with_fallbacks(primary_tag: str, tv: Optional[str], ttv: Optional[str], tau: Optional[str]) -> tuple[bool, str]:
-    if primary_tag == "cu122":
-        candidates = ["cu122", "cu121", "cu118", "cpu"]
-    elif primary_tag == "cu121":
-        candidates = ["cu121", "cu118", "cpu"]
-    elif primary_tag == "cu118":
-        candidates = ["cu118", "cpu"]
-    else:
-        candidates = ["cpu"]
+TORCH_DISTRIBUTIONS = ("torch", "torchvision", "torchaudio")
+_REQ_NAME_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9._-]*")
+
+
+def torch_runtime_deps() -> list[str]:
+    """Requirements declared by the installed torch trio that apply to this environment.
+
+    The trio is installed with --no-deps, so these are read back from its metadata. Requirements
+    between the three packages are skipped so pip never swaps in a build from PyPI, as are those
+    only pulled in by an optional extra of the trio (``extra == ...`` markers). Extras requested
+    on a dependency itself (e.g. ``requests[socks]``) are kept.
+    """
+    import importlib.metadata as md
+    try:
+        from packaging.requirements import InvalidRequirement, Requirement
+    except ImportError:
+        Requirement = None  # type: ignore[assignment,misc]
+    deps: list[str] = []
+    for dist in TORCH_DISTRIBUTIONS:
+        try:
+            lines = md.requires(dist) or []
+        except md.PackageNotFoundError:
+            continue
+        for line in lines:
+            if Requirement is None:
+                # Without packaging, markers cannot be evaluated; pip check below catches what is skipped.
+                spec, sep, _ = line.partition(";")
+                m = _REQ_NAME_RE.match(spec)
+                if not sep and m and m.group(0).lower() not in TORCH_DISTRIBUTIONS:
+                    deps.append(spec.strip())
+                continue
+            try:
+                req = Requirement(line)
+            except InvalidRequirement:
+                log.warning("Skipping unparsable requirement in %s metadata: %s", dist, line)
+                continue
+            if req.name.lower() in TORCH_DISTRIBUTIONS:
+                continue
+            if req.marker and not req.marker.evaluate({"extra": ""}):
+                continue
+            extras = f"[{','.join(sorted(req.extras))}]" if req.extras else ""
+            spec = f"{req.name}{extras}{req.specifier}"
+            if spec not in deps:
+                deps.append(spec)
+    return deps
+
+
+def _broken_torch_requirements() -> list[str]:
+    """Lines of 'pip check' output that concern the torch trio."""
+    code, out, _ = run([sys.executable, "-m", "pip", "check"])
+    if code == 0:
+        return []
+    return [line for line in out.splitlines() if line.split(" ", 1)[0].lower() in TORCH_DISTRIBUTIONS]
+
+
+def install_torch_deps() -> tuple[int, str]:
+    """Install the runtime dependencies of the installed torch trio from the default index."""
+    deps = torch_runtime_deps()
+    if deps:
+        cmd = [sys.executable, "-m", "pip", "install", "--prefer-binary", *deps]
+        log.info("Installing PyTorch runtime dependencies with: %s", " ".join(cmd))
+        code, out, err = run(cmd)
+        log.info(out)
+        if code != 0:
+            log.error(err)
+            return code, err
+    broken = _broken_torch_requirements()
+    if broken:
+        msg = "\n".join(broken)
+        log.error("PyTorch dependencies are still unsatisfied:\n%s", msg)
+        return 1, msg
+    return 0, ""
+
+
+def _tag_has_wheel(tag: str, tv: Optional[str]) -> bool:
+    """Check the tag's simple index for a torch wheel matching tv and this Python before a full install.
+
+    Returns False only when the index positively lacks a match; network errors return True so pip decides.
+    """
+    req = urllib.request.Request(index_url_for_tag(tag) + "/torch/")
+    try:
+        with urllib.request.urlopen(req, timeout=15) as r:
+            page = urllib.parse.unquote(r.read().decode("utf-8", "replace"))
+    except urllib.error.HTTPError as e:
+        return e.code != 404
+    except Exception:
+        return True
+    if not tv:
+        return "torch-" in page
+    py = f"cp{sys.version_info.major}{sys.version_info.minor}"
+    # macOS CPU wheels carry no local version tag.
+    return f"torch-{tv}+{tag}-{py}-" in page or (tag == "cpu" and f"torch-{tv}-{py}-" in page)
+
+
+INSTALL_RETRIES = 3
+
+# stderr fragments that indicate a network blip rather than missing wheels for a tag.
+_TRANSIENT_PIP_ERRORS = (
+    "connection reset",
+    "connection aborted",
+    "read timed out",
+    "connecttimeout",
+    "temporary failure in name resolution",
+    "incompleteread",
+    "too many requests",
+    "service unavailable",
+    "bad gateway",
+    "gateway timeout",
+    *(f"http error {code}" for code in (429, 500, 502, 503, 504)),
+    "429 client error",
+    *(f"{code} server error" for code in (500, 502, 503, 504)),
+)
+
+
+def is_transient_pip_error(err: str) -> bool:
+    err = err.lower()
+    return any(s in err for s in _TRANSIENT_PIP_ERRORS)
+
+
+# Wheel tags to try, in order, for each primary tag.
+_FALLBACK_CHAIN = {
+    "cu122": ["cu122", "cu121", "cu118", "cpu"],
+    "cu121": ["cu121", "cu118", "cpu"],
+    "cu118": ["cu118", "cpu"],
+    "cpu": ["cpu"],
+}
+
+
+def try_install_with_fallbacks(
+    primary_tag: str, tv: Optional[str], ttv: Optional[str], tau: Optional[str], reinstall: bool = False
+) -> tuple[bool, str]:
+    candidates = _FALLBACK_CHAIN.get(primary_tag, ["cpu"])
     last = "cpu"
     for tag in candidates:
         last = tag
-        code = install_torch(tag, tv, ttv, tau)
-        if code == 0:
-            return True, tag
-        print(f"Install failed for tag={tag}. Trying next fallback…")
+        if not _tag_has_wheel(tag, tv):
+            log.warning("No torch%s wheel for tag=%s on %s. Skipping…", f"=={tv}" if tv else "", tag, index_url_for_tag(tag))
+            continue
+        for attempt in range(INSTALL_RETRIES):
+            if attempt:
+                delay = 2 ** attempt
+                log.warning(
+                    "Transient network error for tag=%s; retrying in %ds (attempt %d/%d)…",
+                    tag, delay, attempt + 1, INSTALL_RETRIES,
+                )
+                time.sleep(delay)
+            code, err = install_torch(tag, tv, ttv, tau, reinstall)
+            if code == 0:
+                return True, tag
+            if not is_transient_pip_error(err):
+                break
+        log.warning("Install failed for tag=%s. Trying next fallback…", tag)
     return False, last
 
 
+def _installed_torch_versions() -> dict[str, Optional[str]]:
+    """Installed versions of the torch trio including local tags (e.g. '2.0.0+cu118'), None if missing."""
+    import importlib.metadata as md
+    versions: dict[str, Optional[str]] = {}
+    for dist in TORCH_DISTRIBUTIONS:
+        try:
+            versions[dist] = md.version(dist)
+        except md.PackageNotFoundError:
+            versions[dist] = None
+    return versions
+
+
+def acceptable_tags(tag: str) -> set[str]:
+    """Tags an existing install may carry for the resolved tag: the tag itself or any CUDA fallback of it.
+
+    torch==2.0.0 has no cu121 wheels, so a CUDA 12 driver resolves to cu121 but ends up with cu118.
+    """
+    return {tag} | {t for t in _FALLBACK_CHAIN.get(tag, []) if t != "cpu"}
+
+
+def installed_torch_tag(
+    installed: dict[str, Optional[str]], requested: Tuple[Optional[str], ...], tags: set[str]
+) -> Optional[str]:
+    """Return the shared local tag if the whole trio satisfies the requested versions and tags, else None."""
+    if not all(torch_matches(installed[d], r, tags) for d, r in zip(TORCH_DISTRIBUTIONS, requested)):
+        return None
+    local = {installed[d].partition("+")[2] for d in TORCH_DISTRIBUTIONS}  # type: ignore[union-attr]
+    # A trio mixed from different indexes (e.g. torch cu118 with torchvision cu121) is reinstalled.
+    return local.pop() if len(local) == 1 else None
+
+
+def torch_matches(installed: Optional[str], requested: Optional[str], tags: set[str]) -> bool:
+    """True if an installed version like '2.0.0+cu118' satisfies the requested version (if any) and one of tags."""
+    if not installed:
+        return False
+    version, _, local = installed.partition("+")
+    return local in tags and (requested is None or version == requested)
+
+
 def verify_torch(expect_cuda: bool) -> tuple[bool, str]:
+    # Check the distribution metadata first; importing torch itself takes seconds.
+    import importlib.metadata as md
+    try:
+        md.version("torch")
+    except md.PackageNotFoundError:
+        return False, "torch is not installed"
     try:
         import torch as t  # type: ignore
         import torch.cuda as tc  # type: ignore
     except Exception as e:
         return False, f"Failed to import torch/torch.cuda: {e}"
 
-    # Help Windows locate dependent DLLs
-    try:
-        torclib = Path(t.__file__).parent / "lib"
-        if torclib.exists() and hasattr(os, "add_dll_directory") and os.name == "nt":
-            os.add_dll_directory(str(torclib))
-    except Exception:
-        pass
-
     ver = getattr(t, "__version__", "?")
     cuda_ver = getattr(getattr(t, "version", object()), "cuda", None)
     ok = tc.is_available()
@@ -197,19 +627,33 @@ def verify_torch(expect_cuda: bool) -> tuple[bool, str]:
         return (cuda_ver is None) and (not ok), report
 
 
+def _configure_logging() -> None:
+    """Send INFO to stdout and WARNING and above to stderr, as the print-based output did."""
+    out = logging.StreamHandler(sys.stdout)
+    out.addFilter(lambda record: record.levelno < logging.WARNING)
+    err = logging.StreamHandler(sys.stderr)
+    err.setLevel(logging.WARNING)
+    logging.basicConfig(level=logging.INFO, format="%(message)s", handlers=[out, err])
+
+
 def main() -> None:
     parser = argparse.ArgumentParser(description="Install PyTorch with correct CUDA wheels for DynamiCrafter")
-    parser.add_argument("--tag", choices=["cpu", "cu118", "cu121", "cu122"], help="Override detected wheel tag")
-    parser.add_argument("--reinstall", action="store_true", help="Uninstall any existing torch/vision/audio first")
+    parser.add_argument("--tag", choices=WHEEL_TAGS, help="Override detected wheel tag (or set TORCH_WHEEL_TAG)")
+    parser.add_argument("--reinstall", action="store_true", help="Force-reinstall torch/vision/audio even if already present")
+    parser.add_argument("--refresh", action="store_true", help="Ignore the cached CUDA/MSVC detection result")
     parser.add_argument("--dry-run", action="store_true", help="Print what would be installed, do not execute")
     parser.add_argument("--install-vcredist", action="store_true", help="Install MSVC 2015–2022 (x64) if missing")
     parser.add_argument("--torch-version", dest="tv", help="Override torch version (default: 2.0.0 for Python 3.8)")
     parser.add_argument("--torchvision-version", dest="ttv", help="Override torchvision version (default: 0.15.1 for Python 3.8)")
     parser.add_argument("--torchaudio-version", dest="tau", help="Override torchaudio version (default: 2.0.1 for Python 3.8)")
     args = parser.parse_args()
+    _configure_logging()
+    tag_override = args.tag or os.environ.get("TORCH_WHEEL_TAG")
+    if tag_override and tag_override not in WHEEL_TAGS:
+        parser.error(f"TORCH_WHEEL_TAG must be one of {', '.join(WHEEL_TAGS)} (got {tag_override!r})")
 
-    print(f"Python executable: {sys.executable}")
-    print(f"Python version: {sys.version.splitlines()[0]}")
+    log.info("Python executable: %s", sys.executable)
+    log.info("Python version: %s", sys.version.splitlines()[0])
 
     # Default versions for Python 3.8 (DynamiCrafter reference env)
     tv = args.tv
@@ -220,60 +664,108 @@ def main() -> None:
         ttv = ttv or "0.15.1"
         tau = tau or "2.0.1"
 
-    ensure_pip_available()
-
-    if args.reinstall:
-        uninstall_torch()
-
-    print("Detecting CUDA with nvidia-smi…")
-    ver = detect_cuda_version()
-    if ver:
-        print(f"Detected CUDA Version: {ver[0]}.{ver[1]}")
+    # CUDA_PATH/CUDA_HOME costs nothing to read, so like TORCH_WHEEL_TAG it wins over the cache and is never cached.
+    ver = env_ver = None if tag_override else _detect_cuda_via_env()
+    cache = None if (tag_override or env_ver or args.reinstall or args.refresh) else _load_cache()
+    if cache:
+        log.info("Using cached detection from %s (pass --refresh to re-detect)", _cache_path())
+
+    # The probes are independent of each other and of pip, so overlap them with the pip bootstrap.
+    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as pool:
+        # An explicit tag, a versioned CUDA_PATH/CUDA_HOME or a fresh cache makes CUDA detection unnecessary.
+        cuda_future = None if (tag_override or env_ver or cache) else pool.submit(detect_cuda_version)
+        if cuda_future:
+            log.info("Detecting CUDA (CUDA_PATH/CUDA_HOME, NVML, falling back to nvidia-smi) in the background…")
+        # A cached failure is re-probed so a runtime installed since then is noticed.
+        vc_future = None if (cache and cache.get("vcredist_ok")) else pool.submit(check_vcredist)
+        nvcuda_future = pool.submit(check_nvcuda)
+
+        ensure_pip_available()
+
+        if cuda_future:
+            ver = cuda_future.result()
+        if vc_future:
+            ok_vc, msg_vc = vc_future.result()
+        else:
+            ok_vc, msg_vc = True, "MSVC runtime: OK (cached)"
+        ok_nv, msg_nv = nvcuda_future.result()
+
+    if tag_override:
+        tag = tag_override
+        log.info("Resolved wheel tag: %s (override, CUDA detection skipped)", tag)
+    elif cache:
+        tag = cache["tag"]
+        ver = _version_tuple(cache["cuda"])
+        log.info("Cached CUDA Version: %s", cache["cuda"])
+        log.info("Resolved wheel tag: %s (cached)", tag)
     else:
-        print("No CUDA detected or nvidia-smi unavailable. Defaulting to CPU wheels.")
-
-    auto_tag = map_cuda_to_tag(ver)
-    tag = args.tag or auto_tag
-    print(f"Resolved wheel tag: {tag} (auto={auto_tag})")
-
-    ok_vc, msg_vc = check_vcredist()
-    print(msg_vc)
+        if env_ver:
+            log.info("Detected CUDA Version: %d.%d (from CUDA_PATH/CUDA_HOME)", *ver)
+        elif ver:
+            log.info("Detected CUDA Version: %d.%d", *ver)
+        else:
+            log.info("No CUDA detected or NVML/nvidia-smi unavailable. Defaulting to CPU wheels.")
+        tag = map_cuda_to_tag(ver)
+        log.info("Resolved wheel tag: %s (auto)", tag)
+        # A failed probe (no NVML, nvidia-smi timeout) is not cached so the next run detects again.
+        if ver and not env_ver:
+            _save_cache(ver, tag, ok_vc)
+
+    log.info(msg_vc)
     if not ok_vc and args.install_vcredist:
-        print("Attempting to install Microsoft Visual C++ 2015–2022 (x64) Redistributable silently…")
+        log.info("Attempting to install Microsoft Visual C++ 2015–2022 (x64) Redistributable silently…")
         try:
-            tmpdir = tempfile.mkdtemp(prefix="torch_vc_")
-            exe_path = os.path.join(tmpdir, "vc_redist.x64.exe")
-            print(f"Downloading MSVC redistributable from {VC_REDIST_URL} …")
-            urllib.request.urlretrieve(VC_REDIST_URL, exe_path)
-            print(f"Saved to {exe_path}")
-            code, out, err = run([exe_path, "/quiet", "/norestart"])
+            exe_path = download_vcredist()
+            code, out, err = run([str(exe_path), "/quiet", "/norestart"])
             if out:
-                print(out)
+                log.info(out)
             if code != 0 and err:
-                print(err, file=sys.stderr)
+                log.error(err)
         except Exception as e:
-            print(f"Failed to install MSVC redistributable: {e}")
-
-    if args.dry_run:
-        print("Dry run: skipping installation.")
+            log.warning("Failed to install MSVC redistributable: %s", e)
+        check_vcredist.cache_clear()
+        ok_vc, msg_vc = check_vcredist()
+        log.info("After install: %s", msg_vc)
+
+    installed = {} if args.reinstall else _installed_torch_versions()
+    present_tag = installed_torch_tag(installed, (tv, ttv, tau), acceptable_tags(tag)) if installed else None
+    if present_tag:
+        log.info(
+            "%s already installed for tag=%s; skipping installation (use --reinstall to force).",
+            ", ".join(f"{d} {installed[d]}" for d in TORCH_DISTRIBUTIONS),
+            tag,
+        )
+        if args.dry_run:
+            return
+        ok, used = True, present_tag
+    elif args.dry_run:
+        log.info("Dry run: skipping installation.")
         return
-
-    ok, used = try_install_with_fallbacks(tag, tv, ttv, tau)
+    else:
+        ok, used = try_install_with_fallbacks(tag, tv, ttv, tau, args.reinstall)
+        if ok:
+            log.info("PyTorch installation succeeded using tag=%s.", used)
+            # Remember the CUDA tag that actually had wheels (e.g. cu118 for torch 2.0.0 on a CUDA 12 driver).
+            # A CPU fallback is not recorded: it may stem from a transient failure on the CUDA tags.
+            if ver and not env_ver and not tag_override and used != tag and used != "cpu":
+                _save_cache(ver, used, ok_vc)
+            # Dependencies come from PyPI, so their failure says nothing about the wheel tag.
+            if install_torch_deps()[0] != 0:
+                log.error("PyTorch wheels were installed but their runtime dependencies could not be installed.")
+                sys.exit(1)
     if ok:
-        print(f"PyTorch installation succeeded using tag={used}.")
         expect_cuda = used.startswith("cu")
         v_ok, v_report = verify_torch(expect_cuda)
-        print(v_report)
+        log.info(v_report)
         if not v_ok and expect_cuda:
-            ok_nv, msg_nv = check_nvcuda()
-            print(msg_nv)
-            print(
+            log.info(msg_nv)
+            log.info(
                 "If CUDA is still unavailable, check: 1) NVIDIA driver installed and up-to-date, "
                 "2) MSVC 2015–2022 (x64) Redistributable installed."
             )
-        print("Tip: Launch using .\\.venv\\Scripts\\python or 'uv run --no-sync' to avoid uv replacing CUDA wheels.")
+        log.info("Tip: Launch using .\\.venv\\Scripts\\python or 'uv run --no-sync' to avoid uv replacing CUDA wheels.")
     else:
-        print("PyTorch installation failed after trying all fallbacks.")
+        log.error("PyTorch installation failed after trying all fallbacks.")
         sys.exit(1)
 
 